@@ -12,58 +12,85 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import random
 import argparse
+import json
 import dimod
-import sys
-import networkx as nx
 import numpy as np
 from dwave.system import LeapHybridSampler
+from scipy.spatial.distance import cdist, pdist
 
-import matplotlib
 try:
-    import matplotlib.pyplot as plt
+    from numba import njit, prange
 except ImportError:
-    matplotlib.use("agg")
-    import matplotlib.pyplot as plt
+    njit = None
+    prange = range
 
-def read_in_args():
-    """Read in user specified parameters or use defaults."""
+# Candidate count above which the pairwise biases are built with Numba, where
+# the dense n by n distance matrix of the NumPy path gets too large
+_NUMBA_MIN_NODES = 1000
+
+def positive_int(value):
+    """Argparse type for options that must be positive integers."""
+
+    value = int(value)
+    if value <= 0:
+        raise argparse.ArgumentTypeError("must be a positive integer")
+    return value
+
+def nonnegative_int(value):
+    """Argparse type for options that must be non-negative integers."""
+
+    value = int(value)
+    if value < 0:
+        raise argparse.ArgumentTypeError("must be a non-negative integer")
+    return value
+
+def read_in_args(argv=None):
+    """Read in user specified parameters or use defaults.
+
+    Args:
+        argv (list of str, optional): Command-line arguments; defaults to
+            ``sys.argv[1:]``
+
+    Returns:
+        args (argparse.Namespace): Parsed and validated options
+    """
 
     # Set up user-specified optional arguments
     parser = argparse.ArgumentParser()
-    parser.add_argument("-s", "--seed", help="set a random seed for scenario", type=int)
-    parser.add_argument("-x", "--width", help="set the width of the grid", default=15, type=int)
-    parser.add_argument("-y", "--height", help="set the height of the grid", default=15, type=int)
-    parser.add_argument("-p", "--poi", help="set the number of POIs", default=3, type=int)
-    parser.add_argument("-c", "--chargers", help="set the number of existing chargers", default=4, type=int)
-    parser.add_argument("-n", "--new-chargers", help="set the number of new chargers", default=2, type=int)
-    args = parser.parse_args()
-
-    # Read in user-specified values
-    w = args.width
-    h = args.height
-    num_poi = args.poi
-    num_cs = args.chargers
-    num_new_cs = args.new_chargers
-
-    # Set seed if specified by user
-    if (args.seed):
-        random.seed(args.seed)
-
-    # Make sure specified values are non-negative
-    if (w < 0) or (h < 0) or (num_poi < 0) or (num_cs < 0) or (num_new_cs < 0):
-        print("All option values must be non-negative.")
-        sys.exit(0)
+    parser.add_argument("-s", "--seed", help="set a random seed for scenario", type=nonnegative_int)
+    parser.add_argument("-x", "--width", help="set the width of the grid", default=15, type=positive_int)
+    parser.add_argument("-y", "--height", help="set the height of the grid", default=15, type=positive_int)
+    parser.add_argument("-p", "--poi", help="set the number of POIs", default=3, type=nonnegative_int)
+    parser.add_argument("-c", "--chargers", help="set the number of existing chargers", default=4, type=nonnegative_int)
+    parser.add_argument("-n", "--new-chargers", help="set the number of new chargers", default=2, type=nonnegative_int)
+    parser.add_argument("--json", help="print the solution statistics as one line of JSON", action="store_true")
+    args = parser.parse_args(argv)
 
     # Make sure grid is large enough for scenario
-    if (num_poi > w*h) or (num_cs + num_new_cs > w*h):
-        print("Grid size is not large enough for scenario.")
-        sys.exit(0)
+    num_grid_nodes = args.width * args.height
+    if (args.poi > num_grid_nodes) or (args.chargers + args.new_chargers > num_grid_nodes):
+        parser.error("Grid size is not large enough for scenario.")
 
     return args
 
-def set_up_scenario(w, h, num_poi, num_cs):
+def grid_coords(w, h):
+    """Coordinates of every location on a w by h grid.
+
+    Args:
+        w (int): Width of grid
+        h (int): Height of grid
+
+    Returns:
+        nodes (array of ints): One (x, y) row per location, with location
+            (x, y) in row x*h + y
+    """
+
+    return np.stack(np.meshgrid(np.arange(w, dtype=np.int32),
+                                np.arange(h, dtype=np.int32),
+                                indexing='ij'), axis=-1).reshape(-1, 2)
+
+def set_up_scenario(w, h, num_poi, num_cs, seed=None):
     """Build scenario set up with specified parameters.
     
     Args:
@@ -71,88 +98,143 @@ def set_up_scenario(w, h, num_poi, num_cs):
         h (int): Height of grid
         num_poi (int): Number of points of interest
         num_cs (int): Number of existing charging stations
+        seed (int, optional): Random seed for the scenario
     
     Returns:
-        G (networkx graph): Grid graph of size w by h
-        pois (list of tuples of ints): A fixed set of points of interest
-        charging_stations (list of tuples of ints): 
-            Set of current charging locations
-        potential_new_cs_nodes (list of tuples of ints): 
-            Potential new charging locations
+        nodes (array of ints): All grid locations, one (x, y) row per
+            location, in the node order of a w by h grid graph
+        pois (array of ints): A fixed set of points of interest, one (x, y)
+            row per location
+        charging_stations (array of ints):
+            Set of current charging locations, one (x, y) row per location
+        potential_new_cs_nodes (array of ints):
+            Potential new charging locations, one (x, y) row per location
     """
 
-    G = nx.grid_2d_graph(w, h)
-    nodes = list(G.nodes)
+    nodes = grid_coords(w, h)
+
+    rng = np.random.default_rng(seed)
 
     # Identify a fixed set of points of interest
-    pois = random.sample(nodes, k=num_poi)
+    pois = nodes[rng.choice(w*h, size=num_poi, replace=False)]
 
     # Identify a fixed set of current charging locations
-    charging_stations = random.sample(nodes, k=num_cs)
+    cs_idx = rng.choice(w*h, size=num_cs, replace=False)
+    charging_stations = nodes[cs_idx]
 
     # Identify potential new charging locations
-    potential_new_cs_nodes = list(G.nodes() - charging_stations)
+    cs_mask = np.zeros(w*h, dtype=bool)
+    cs_mask[cs_idx] = True
+    potential_new_cs_nodes = nodes[~cs_mask]
+
+    return nodes, pois, charging_stations, potential_new_cs_nodes
+
+def _build_pairs_numba(cand_x, cand_y, gamma3, gamma4):
+    """Compute the quadratic biases of constraints 3 and 4 in COO format.
+
+    Compiled with Numba when it is installed. Each candidate ``i`` writes its
+    pairs ``(i, j > i)`` to a disjoint slice of the output, so the outer loop
+    runs in parallel without materializing an n by n distance matrix.
+
+    Args:
+        cand_x (array of ints): x-coordinates of potential new charging locations
+        cand_y (array of ints): y-coordinates of potential new charging locations
+        gamma3 (float): Weight of the pairwise distance between new chargers
+        gamma4 (float): Weight of the exactly-num_new_cs penalty
+
+    Returns:
+        rows (array of ints): First variable of each pair
+        cols (array of ints): Second variable of each pair
+        vals (array of floats): Quadratic bias of each pair
+    """
+
+    n = len(cand_x)
+    num_pairs = n * (n - 1) // 2
+    rows = np.empty(num_pairs, dtype=np.int32)
+    cols = np.empty(num_pairs, dtype=np.int32)
+    vals = np.empty(num_pairs, dtype=np.float64)
 
-    return G, pois, charging_stations, potential_new_cs_nodes
+    for i in prange(n):
+        # Number of pairs (r, c) with r < i, i.e. where row i starts
+        start = i * n - i * (i + 1) // 2
+        for j in range(i + 1, n):
+            idx = start + j - i - 1
+            dx = cand_x[i] - cand_x[j]
+            dy = cand_y[i] - cand_y[j]
+            rows[idx] = i
+            cols[idx] = j
+            vals[idx] = -(dx * dx + dy * dy) * gamma3 + 2 * gamma4
 
-def distance(a, b):
-    return (a[0]**2 - 2*a[0]*b[0] + b[0]**2) + (a[1]**2 - 2*a[1]*b[1] + b[1]**2)
+    return rows, cols, vals
+
+if njit is not None:
+    _build_pairs_numba = njit(parallel=True, fastmath=True, cache=True)(_build_pairs_numba)
 
 def build_bqm(potential_new_cs_nodes, num_poi, pois, num_cs, charging_stations, num_new_cs):
     """Build bqm that models our problem scenario for the hybrid sampler. 
 
     Args:
-        potential_new_cs_nodes (list of tuples of ints):
-            Potential new charging locations
+        potential_new_cs_nodes (array of ints):
+            Potential new charging locations, one (x, y) row per location
         num_poi (int): Number of points of interest
-        pois (list of tuples of ints): A fixed set of points of interest
+        pois (array of ints):
+            A fixed set of points of interest, one (x, y) row per location
         num_cs (int): Number of existing charging stations
-        charging_stations (list of tuples of ints): 
-            Set of current charging locations
+        charging_stations (array of ints):
+            Set of current charging locations, one (x, y) row per location
         num_new_cs (int): Number of new charging stations desired
     
     Returns:
         bqm_np (BinaryQuadraticModel): QUBO model for the input scenario
     """
 
+    # Candidate locations as an (n, 2) coordinate array
+    cand = np.asarray(potential_new_cs_nodes, dtype=np.int32).reshape(-1, 2)
+    num_nodes = len(cand)
+
     # Tunable parameters
-    gamma1 = len(potential_new_cs_nodes) * 4
-    gamma2 = len(potential_new_cs_nodes) / 3
-    gamma3 = len(potential_new_cs_nodes) * 1.7
-    gamma4 = len(potential_new_cs_nodes) ** 3
+    gamma1 = num_nodes * 4
+    gamma2 = num_nodes / 3
+    gamma3 = num_nodes * 1.7
+    gamma4 = num_nodes ** 3
 
-    # Build BQM using adjVectors to find best new charging location s.t. min
+    # Build BQM biases as arrays to find best new charging location s.t. min
     # distance to POIs and max distance to existing charging locations
-    bqm = dimod.BinaryQuadraticModel(len(potential_new_cs_nodes), 'BINARY')
-
-    # Constraint 1: Min average distance to POIs
-    if num_poi > 0:
-        for i in range(len(potential_new_cs_nodes)):
-            # Compute average distance to POIs from this node
-            cand_loc = potential_new_cs_nodes[i]
-            avg_dist = sum(distance(cand_loc, loc) for loc in pois) / num_poi
-            bqm.linear[i] += avg_dist * gamma1
-
-    # Constraint 2: Max distance to existing chargers
-    if num_cs > 0:
-        for i in range(len(potential_new_cs_nodes)):
-            # Compute average distance to POIs from this node
-            cand_loc = potential_new_cs_nodes[i]
-            avg_dist = -sum(distance(cand_loc, loc)
-                            for loc in charging_stations) / num_cs
-            bqm.linear[i] += avg_dist * gamma2
-
-    # Constraint 3: Max distance to other new charging locations
-    if num_new_cs > 1:
-        for i in range(len(potential_new_cs_nodes)):
-            for j in range(i+1, len(potential_new_cs_nodes)):
-                ai = potential_new_cs_nodes[i]
-                aj = potential_new_cs_nodes[j]
-                dist = -distance(ai, aj)
-                bqm.add_interaction(i, j, dist * gamma3)
-
-    # Constraint 4: Choose exactly num_new_cs new charging locations
-    bqm.update(dimod.generators.combinations(bqm.variables, num_new_cs, strength=gamma4))
+    pois = np.asarray(pois, dtype=np.int32).reshape(-1, 2)
+    charging_stations = np.asarray(charging_stations, dtype=np.int32).reshape(-1, 2)
+
+    # Constraints 1 and 2: Min average distance to POIs and max average
+    # distance to existing chargers, as one weighted sum over both sets
+    targets = np.concatenate([pois, charging_stations])
+    weights = np.concatenate([np.full(len(pois), gamma1 / num_poi if num_poi > 0 else 0.),
+                              np.full(len(charging_stations), -gamma2 / num_cs if num_cs > 0 else 0.)])
+    linear = cdist(cand, targets, 'sqeuclidean') @ weights
+
+    # Constraint 4: Choose exactly num_new_cs new charging locations, using the
+    # expansion of gamma4 * (sum(x) - num_new_cs)**2
+    linear += (1 - 2 * num_new_cs) * gamma4
+    offset = num_new_cs ** 2 * gamma4
+
+    # Quadratic biases for every pair of candidates: constraint 3 (max
+    # distance to other new charging locations) plus the pairwise part of
+    # constraint 4
+    if njit is not None and num_nodes >= _NUMBA_MIN_NODES:
+        rows, cols, quadratic = _build_pairs_numba(np.ascontiguousarray(cand[:, 0]),
+                                                   np.ascontiguousarray(cand[:, 1]),
+                                                   gamma3 if num_new_cs > 1 else 0.,
+                                                   gamma4)
+    else:
+        rows, cols = np.triu_indices(num_nodes, k=1)
+        quadratic = np.full(len(rows), 2. * gamma4)
+        if num_new_cs > 1:
+            # pdist returns the upper triangle in the same (row, col) order
+            quadratic -= pdist(cand, 'sqeuclidean') * gamma3
+
+    # Load all biases into the BQM in one bulk call
+    bqm = dimod.BinaryQuadraticModel.from_numpy_vectors(linear=linear,
+                                                        quadratic=(rows, cols, quadratic),
+                                                        offset=offset,
+                                                        vartype=dimod.BINARY)
 
     return bqm
 
@@ -162,64 +244,121 @@ def run_bqm_and_collect_solutions(bqm, sampler, potential_new_cs_nodes, **kwargs
     Args:
         bqm (BinaryQuadraticModel): The QUBO model for the problem instance
         sampler: Sampler or solver to be used
-        potential_new_cs_nodes (list of tuples of ints): 
-            Potential new charging locations
+        potential_new_cs_nodes (array of ints):
+            Potential new charging locations, one (x, y) row per location
         **kwargs: Sampler-specific parameters to be used
     
     Returns:
-        new_charging_nodes (list of tuples of ints): 
-            Locations of new charging stations
+        new_charging_nodes (array of ints): 
+            Locations of new charging stations, one (x, y) row per location
     """
 
     sampleset = sampler.sample(bqm,
                                label='Example - EV Charger Placement',
                                **kwargs)
 
-    ss = sampleset.first.sample
-    new_charging_nodes = [potential_new_cs_nodes[k] for k, v in ss.items() if v == 1]
+    # Selected variables of the lowest-energy sample, in index order
+    best = sampleset.record.sample[np.argmin(sampleset.record.energy)]
+    selected = np.sort(np.asarray(sampleset.variables)[best == 1])
+    new_charging_nodes = np.asarray(potential_new_cs_nodes).reshape(-1, 2)[selected]
 
     return new_charging_nodes
 
+def compute_solution_stats(pois, num_poi, charging_stations, num_cs, new_charging_nodes, num_new_cs):
+    """Compute distance statistics for the new charger locations.
+
+    Args:
+        pois (array of ints):
+            A fixed set of points of interest, one (x, y) row per location
+        num_poi (int): Number of points of interest
+        charging_stations (array of ints):
+            A fixed set of current charging locations, one (x, y) row per
+            location
+        num_cs (int): Number of existing charging stations
+        new_charging_nodes (array of ints):
+            Locations of new charging stations, one (x, y) row per location
+        num_new_cs (int): Number of new charging stations desired
+
+    Returns:
+        stats (dict): Solution statistics, with keys
+            - 'new_charging_nodes': New charger locations as [x, y] lists
+            - 'poi_avg_dist': Average distance from each new charger to the
+              POIs, or None if there are no POIs
+            - 'old_cs_avg_dist': Average distance from each new charger to
+              the existing chargers, or None if there are none
+            - 'new_cs_dist': Total distance between new chargers, or None if
+              fewer than two were requested
+    """
+
+    new_charging_nodes = np.asarray(new_charging_nodes).reshape(-1, 2)
+
+    stats = {'new_charging_nodes': new_charging_nodes.tolist(),
+             'poi_avg_dist': None,
+             'old_cs_avg_dist': None,
+             'new_cs_dist': None}
+
+    if num_poi > 0:
+        poi_avg_dist = cdist(new_charging_nodes, np.asarray(pois).reshape(-1, 2), 'cityblock').sum(axis=1) / num_poi
+        stats['poi_avg_dist'] = poi_avg_dist.tolist()
+
+    if num_cs > 0:
+        old_cs_avg_dist = cdist(new_charging_nodes, np.asarray(charging_stations).reshape(-1, 2), 'cityblock').sum(axis=1) / num_cs
+        stats['old_cs_avg_dist'] = old_cs_avg_dist.tolist()
+
+    if num_new_cs > 1:
+        stats['new_cs_dist'] = int(pdist(new_charging_nodes, 'cityblock').sum())
+
+    return stats
+
 def printout_solution_to_cmdline(pois, num_poi, charging_stations, num_cs, new_charging_nodes, num_new_cs):
     """Print solution statistics to command line.
     
     Args:
-        pois (list of tuples of ints): A fixed set of points of interest
+        pois (array of ints):
+            A fixed set of points of interest, one (x, y) row per location
         num_poi (int): Number of points of interest
-        charging_stations (list of tuples of ints): 
-            A fixed set of current charging locations
+        charging_stations (array of ints):
+            A fixed set of current charging locations, one (x, y) row per
+            location
         num_cs (int): Number of existing charging stations
-        new_charging_nodes (list of tuples of ints): 
-            Locations of new charging stations
+        new_charging_nodes (array of ints):
+            Locations of new charging stations, one (x, y) row per location
         num_new_cs (int): Number of new charging stations desired
     
     Returns:
-        None.
+        stats (dict): The printed statistics, as returned by
+            :func:`compute_solution_stats`
     """
 
+    stats = compute_solution_stats(pois, num_poi, charging_stations, num_cs, new_charging_nodes, num_new_cs)
+
     print("\nSolution returned: \n------------------")
 
-    print("\nNew charging locations:\t\t\t\t", new_charging_nodes)
+    print("\nNew charging locations:\t\t\t\t", [tuple(node) for node in stats['new_charging_nodes']])
 
-    if num_poi > 0:
-        poi_avg_dist = [0] * len(new_charging_nodes)
-        for loc in pois:
-            for i, new in enumerate(new_charging_nodes):
-                poi_avg_dist[i] += sum(abs(a - b) for a, b in zip(new, loc)) / num_poi
-        print("Average distance to POIs:\t\t\t", poi_avg_dist)
+    if stats['poi_avg_dist'] is not None:
+        print("Average distance to POIs:\t\t\t", stats['poi_avg_dist'])
 
-    if num_cs > 0:
-        old_cs_avg_dist = [sum(abs(a - b) for a, b in zip(new, loc) for loc in charging_stations) / num_cs for new in new_charging_nodes]
-        print("Average distance to old charging stations:\t", old_cs_avg_dist)
+    if stats['old_cs_avg_dist'] is not None:
+        print("Average distance to old charging stations:\t", stats['old_cs_avg_dist'])
 
-    if num_new_cs > 1:
-        new_cs_dist = 0
-        for i in range(num_new_cs):
-            for j in range(i+1, num_new_cs):
-                new_cs_dist += abs(new_charging_nodes[i][0]-new_charging_nodes[j][0])+abs(new_charging_nodes[i][1]-new_charging_nodes[j][1])
-        print("Distance between new chargers:\t\t\t", new_cs_dist)
+    if stats['new_cs_dist'] is not None:
+        print("Distance between new chargers:\t\t\t", stats['new_cs_dist'])
+
+    return stats
+
+def _import_pyplot():
+    """Import pyplot on first use rather than at startup."""
+
+    import matplotlib
+    try:
+        import matplotlib.pyplot as plt
+    except ImportError:
+        matplotlib.use("agg")
+        import matplotlib.pyplot as plt
+    return plt
 
-def save_output_image(G, pois, charging_stations, new_charging_nodes):
+def save_output_image(w, h, pois, charging_stations, new_charging_nodes):
     """ Create output image of solution scenario.
             - Black nodes: available space
             - Red nodes: current charger location
@@ -227,65 +366,72 @@ def save_output_image(G, pois, charging_stations, new_charging_nodes):
             - Blue nodes: new charger locations
 
     Args:
-        G (networkx graph): Grid graph of size w by h
-        pois (list of tuples of ints): A fixed set of points of interest
-        charging_stations (list of tuples of ints): 
-            A fixed set of current charging locations
-        new_charging_nodes (list of tuples of ints): 
-            Locations of new charging stations
+        w (int): Width of grid
+        h (int): Height of grid
+        pois (array of ints):
+            A fixed set of points of interest, one (x, y) row per location
+        charging_stations (array of ints):
+            A fixed set of current charging locations, one (x, y) row per
+            location
+        new_charging_nodes (array of ints):
+            Locations of new charging stations, one (x, y) row per location
     
     Returns:
         None. Output saved to file "map.png".
     """
 
+    pois = np.asarray(pois).reshape(-1, 2)
+    charging_stations = np.asarray(charging_stations).reshape(-1, 2)
+    new_charging_nodes = np.asarray(new_charging_nodes).reshape(-1, 2)
+
+    # Plotting library is only needed here
+    plt = _import_pyplot()
+    from matplotlib.collections import LineCollection
+
     fig, (ax1, ax2) = plt.subplots(1, 2)
     fig.suptitle('New EV Charger Locations')
-    pos = {x: [x[0],x[1]] for x in G.nodes()}
-
-    # Locate POIs in map
-    poi_graph = G.subgraph(pois)
-    poi_labels = {x: 'P' for x in poi_graph.nodes()}
-
-    # Locate old charging stations in map
-    cs_graph = G.subgraph(charging_stations)
-
-    # Locate old charging stations at POIs in map
-    poi_cs_list = set(pois) - (set(pois)-set(charging_stations))
-    poi_cs_graph = G.subgraph(poi_cs_list)
-    poi_cs_labels = {x: 'P' for x in poi_graph.nodes()}
-
-    # Draw old map (left image)
-    nx.draw_networkx(G, ax=ax1, pos=pos, with_labels=False, node_color='k', font_color='w')
-    nx.draw_networkx(poi_graph, ax=ax1, pos=pos, with_labels=True,
-                        labels=poi_labels, node_color='k', font_color='w')
-    nx.draw_networkx(cs_graph, ax=ax1, pos=pos, with_labels=False, node_color='r',
-                        font_color='k')
-    nx.draw_networkx(poi_cs_graph, ax=ax1, pos=pos, with_labels=True,
-                        labels=poi_cs_labels, node_color='r', font_color='w')
-
-    # Draw new map (right image)
-    new_cs_graph = G.subgraph(new_charging_nodes)
-    nx.draw_networkx(G, ax=ax2, pos=pos, with_labels=False, node_color='k',
-                        font_color='w')
-    nx.draw_networkx(poi_graph, ax=ax2, pos=pos, with_labels=True,
-                        labels=poi_labels,node_color='k', font_color='w')
-    nx.draw_networkx(cs_graph, ax=ax2, pos=pos, with_labels=False, node_color='r',
-                        font_color='k')
-    nx.draw_networkx(poi_cs_graph, ax=ax2, pos=pos, with_labels=True,
-                        labels=poi_cs_labels,  node_color='r', font_color='w')
-    nx.draw_networkx(new_cs_graph, ax=ax2, pos=pos, with_labels=False,
-                        node_color='#00b4d9', font_color='w')
+    node_xy = grid_coords(w, h)
+
+    # Each row and column of the grid is one straight line through its nodes
+    grid_lines = ([[(0, y), (w - 1, y)] for y in range(h)]
+                  + [[(x, 0), (x, h - 1)] for x in range(w)])
+
+    # Draw old map (left image) and new map (right image), sharing the grid
+    # layout and drawing each set of nodes in one scatter call
+    old_map = [(charging_stations, 'r')]
+    new_map = [(charging_stations, 'r'), (new_charging_nodes, '#00b4d9')]
+    for ax, highlights in ((ax1, old_map), (ax2, new_map)):
+        ax.add_collection(LineCollection(grid_lines, colors='k', linewidths=1, zorder=1))
+        ax.scatter(node_xy[:, 0], node_xy[:, 1], s=300, c='k', zorder=2)
+        for xy, color in highlights:
+            ax.scatter(xy[:, 0], xy[:, 1], s=300, c=color, zorder=2)
+        for x, y in pois.tolist():
+            ax.text(x, y, 'P', color='w', fontsize=12, ha='center', va='center', zorder=3)
+        ax.margins(0.1)
+        ax.tick_params(axis='both', which='both', bottom=False, left=False,
+                       labelbottom=False, labelleft=False)
 
     # Save image
-    plt.savefig("map.png")
+    plt.savefig("map.png", dpi=80)
+    plt.close(fig)
 
-if __name__ == '__main__':
+def main(argv=None):
+    """Run the demo end to end on the Leap hybrid solver.
+
+    Args:
+        argv (list of str, optional): Command-line arguments; defaults to
+            ``sys.argv[1:]``
+
+    Returns:
+        stats (dict): Solution statistics, as returned by
+            :func:`compute_solution_stats`. The map is saved to "map.png".
+    """
 
     # Collect user inputs
-    args = read_in_args()
+    args = read_in_args(argv)
 
-    # Build large grid graph for city
-    G, pois, charging_stations, potential_new_cs_nodes = set_up_scenario(args.width, args.height, args.poi, args.chargers)
+    # Build large grid for city
+    nodes, pois, charging_stations, potential_new_cs_nodes = set_up_scenario(args.width, args.height, args.poi, args.chargers, args.seed)
 
     # Build BQM
     bqm = build_bqm(potential_new_cs_nodes, args.poi, pois, args.chargers, charging_stations, args.new_chargers)
@@ -297,7 +443,16 @@ if __name__ == '__main__':
     new_charging_nodes = run_bqm_and_collect_solutions(bqm, sampler, potential_new_cs_nodes)
 
     # Print results to commnand-line for user
-    printout_solution_to_cmdline(pois, args.poi, charging_stations, args.chargers, new_charging_nodes, args.new_chargers)
+    stats = printout_solution_to_cmdline(pois, args.poi, charging_stations, args.chargers, new_charging_nodes, args.new_chargers)
 
     # Create scenario output image
-    save_output_image(G, pois, charging_stations, new_charging_nodes)
+    save_output_image(args.width, args.height, pois, charging_stations, new_charging_nodes)
+
+    # Machine-readable results for scripts comparing runs
+    if args.json:
+        print(json.dumps(stats))
+
+    return stats
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
+
 import numpy as np
 import dimod
 from dwave.system import LeapHybridSampler
@@ -22,74 +24,79 @@ def build_bqm(potential_new_cs_nodes, num_poi, pois, num_cs, charging_stations,
     """Build bqm that models our problem scenario using NumPy. 
 
     Args:
-        potential_new_cs_nodes (list of tuples of ints): 
-            Potential new charging locations
+        potential_new_cs_nodes (array of ints):
+            Potential new charging locations, one (x, y) row per location
         num_poi (int): Number of points of interest
-        pois (list of tuples of ints): A fixed set of points of interest
+        pois (array of ints):
+            A fixed set of points of interest, one (x, y) row per location
         num_cs (int): Number of existing charging stations
-        charging_stations (list of tuples of ints): 
-            A fixed set of current charging locations
+        charging_stations (array of ints):
+            A fixed set of current charging locations, one (x, y) row per
+            location
         num_new_cs (int): Number of new charging stations desired
     
     Returns:
         bqm_np (BinaryQuadraticModel): QUBO model for the input scenario
     """
 
+    n = len(potential_new_cs_nodes)
+
     # Tunable parameters
-    gamma1 = len(potential_new_cs_nodes) * 4.
-    gamma2 = len(potential_new_cs_nodes) / 3.
-    gamma3 = len(potential_new_cs_nodes) * 1.7
-    gamma4 = len(potential_new_cs_nodes) ** 3
+    gamma1 = n * 4.
+    gamma2 = n / 3.
+    gamma3 = n * 1.7
+    gamma4 = n ** 3
 
     # Build BQM using adjVectors to find best new charging location s.t. min
     # distance to POIs and max distance to existing charging locations
-    linear = np.zeros(len(potential_new_cs_nodes))
+    linear = np.zeros(n)
 
-    nodes_array = np.asarray(potential_new_cs_nodes)
-    pois_array = np.asarray(pois)
-    cs_array = np.asarray(charging_stations)
+    # Grid coordinates are small non-negative integers, so keep them and the
+    # squared distances below in integer arrays; only the gamma scaling
+    # produces floats
+    nodes_array = np.asarray(potential_new_cs_nodes, dtype=np.int32).reshape(-1,2)
+    pois_array = np.asarray(pois, dtype=np.int32).reshape(-1,2)
+    cs_array = np.asarray(charging_stations, dtype=np.int32).reshape(-1,2)
+
+    # Squared norms of each point set, shared by all distance constraints
+    # through |a - b|^2 = |a|^2 + |b|^2 - 2ab
+    nodes_sq = np.einsum('ij,ij->i', nodes_array, nodes_array, dtype=np.int64)
 
     # Constraint 1: Min average distance to POIs
     if num_poi > 0:
 
-        ct_matrix = (np.matmul(nodes_array, pois_array.T)*(-2.) 
-                    + np.sum(np.square(pois_array), axis=1).astype(float) 
-                    + np.sum(np.square(nodes_array), axis=1).reshape(-1,1).astype(float))
+        pois_sq = np.einsum('ij,ij->i', pois_array, pois_array, dtype=np.int64)
+        ct_matrix = (np.matmul(nodes_array, pois_array.T, dtype=np.int64)*(-2) 
+                    + pois_sq + nodes_sq.reshape(-1,1))
 
-        linear += np.sum(ct_matrix, axis=1) / num_poi * gamma1
+        linear += (gamma1 / num_poi) * np.sum(ct_matrix, axis=1)
 
     # Constraint 2: Max distance to existing chargers
     if num_cs > 0:    
 
-        dist_mat = (np.matmul(nodes_array, cs_array.T)*(-2.) 
-                    + np.sum(np.square(cs_array), axis=1).astype(float) 
-                    + np.sum(np.square(nodes_array), axis=1).reshape(-1,1).astype(float))
+        cs_sq = np.einsum('ij,ij->i', cs_array, cs_array, dtype=np.int64)
+        dist_mat = (np.matmul(nodes_array, cs_array.T, dtype=np.int64)*(-2) 
+                    + cs_sq + nodes_sq.reshape(-1,1))
 
-        linear += -1 * np.sum(dist_mat, axis=1) / num_cs * gamma2 
+        linear -= (gamma2 / num_cs) * np.sum(dist_mat, axis=1)
 
     # Constraint 3: Max distance to other new charging locations
     if num_new_cs > 1:
 
-        dist_mat = -gamma3*((np.matmul(nodes_array, nodes_array.T)*(-2.) 
-                    + np.sum(np.square(nodes_array), axis=1)).astype(float) 
-                    + np.sum(np.square(nodes_array), axis=1).reshape(-1,1).astype(float))
+        dist_mat = -gamma3*(np.matmul(nodes_array, nodes_array.T, dtype=np.int64)*(-2) 
+                    + nodes_sq + nodes_sq.reshape(-1,1))
 
     else:
-        dist_mat = np.zeros((len(potential_new_cs_nodes),len(potential_new_cs_nodes)))
+        dist_mat = np.zeros((n, n))
 
     # Constraint 4: Choose exactly num_new_cs new charging locations
     linear += (1-2*num_new_cs)*gamma4
     dist_mat += 2*gamma4
-    dist_mat = np.triu(dist_mat, k=1).flatten()
 
-    quad_col = np.tile(np.arange(len(potential_new_cs_nodes)), len(potential_new_cs_nodes))
-    quad_row = np.tile(np.arange(len(potential_new_cs_nodes)), 
-                (len(potential_new_cs_nodes),1)).flatten('F')
+    # Upper triangle of the pairwise biases in COO format
+    q1, q2 = np.triu_indices(n, k=1)
+    q3 = dist_mat[q1, q2]
 
-    q2 = quad_col[dist_mat != 0]
-    q1 = quad_row[dist_mat != 0]
-    q3 = dist_mat[dist_mat != 0]
-    
     bqm_np = dimod.BinaryQuadraticModel.from_numpy_vectors(linear=linear, 
                                                             quadratic=(q1, q2, q3), 
                                                             offset=0, 
@@ -102,11 +109,12 @@ if __name__ == '__main__':
     # Collect user inputs
     args = demo.read_in_args()
 
-    # Build large grid graph for city
-    G, pois, charging_stations, potential_new_cs_nodes = demo.set_up_scenario(args.width, 
+    # Build large grid for city
+    nodes, pois, charging_stations, potential_new_cs_nodes = demo.set_up_scenario(args.width, 
                                                                             args.height, 
                                                                             args.poi, 
-                                                                            args.chargers)
+                                                                            args.chargers,
+                                                                            args.seed)
 
     # Build BQM
     bqm = build_bqm(potential_new_cs_nodes, 
@@ -123,12 +131,20 @@ if __name__ == '__main__':
     new_charging_nodes = demo.run_bqm_and_collect_solutions(bqm, sampler, potential_new_cs_nodes)
 
     # Print results to commnand-line for user
-    demo.printout_solution_to_cmdline(pois, 
-                                    args.poi, 
-                                    charging_stations, 
-                                    args.chargers, 
-                                    new_charging_nodes, 
-                                    args.new_chargers)
+    stats = demo.printout_solution_to_cmdline(pois, 
+                                              args.poi, 
+                                              charging_stations, 
+                                              args.chargers, 
+                                              new_charging_nodes, 
+                                              args.new_chargers)
 
     # Create scenario output image
-    demo.save_output_image(G, pois, charging_stations, new_charging_nodes)
\ No newline at end of file
+    demo.save_output_image(args.width, 
+                           args.height, 
+                           pois, 
+                           charging_stations, 
+                           new_charging_nodes)
+
+    # Machine-readable results for scripts comparing runs
+    if args.json:
+        print(json.dumps(stats))
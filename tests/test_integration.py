@@ -12,55 +12,86 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+import io
+import json
 import os
-import subprocess
-import sys
 import unittest
 import random
-import math
+from contextlib import redirect_stdout
 
 import dimod
 import numpy as np
 from dwave.samplers import SimulatedAnnealingSampler
+from scipy.spatial.distance import pdist
 
 import demo
 import demo_numpy
 
-project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# POIs for test_close_to_pois and their centroid, rounded to a grid location
+_FIXED_POIS = [(0,0),(6,14),(14,0)]
+_POI_CENTROID = tuple(int(round(x)) for x in np.mean(_FIXED_POIS, axis=0))
 
 class TestSmoke(unittest.TestCase):
     @unittest.skipIf(os.getenv('SKIP_INT_TESTS'), "Skipping integration test.")
     def test_smoke(self):
-        """Run demo.py and check that nothing crashes"""
+        """Run the demo in-process and check that it places the new chargers"""
 
-        demo_file = os.path.join(project_dir, 'demo.py')
-        subprocess.check_output([sys.executable, demo_file])
+        output = io.StringIO()
+        with redirect_stdout(output):
+            stats = demo.main(["--json", "-s", "42"])
+
+        self.assertEqual(len(stats['new_charging_nodes']), 2)
+        self.assertEqual(json.loads(output.getvalue().splitlines()[-1]), stats)
+
+@functools.lru_cache(maxsize=None)
+def _scenario(w, h, num_poi, num_cs, seed):
+    """Scenario shared by all tests with the same parameters; do not modify."""
+    return demo.set_up_scenario(w, h, num_poi, num_cs, seed)
+
+@functools.lru_cache(maxsize=None)
+def _bqm(w, h, num_poi, num_cs, num_new_cs, seed):
+    """demo.build_bqm result for a shared scenario; do not modify."""
+    _, pois, charging_stations, potential_new_cs_nodes = _scenario(w, h, num_poi, num_cs, seed)
+    return demo.build_bqm(potential_new_cs_nodes, num_poi, pois, num_cs, charging_stations, num_new_cs)
 
 class TestDemo(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Seeded scenario size shared by the tests below so that its scenario
+        # and BQM are only built once
+        rng = random.Random(2020)
+        cls.w, cls.h = (rng.randint(10,20), rng.randint(10,20))
+        cls.num_poi, cls.num_cs, cls.num_new_cs = (rng.randint(1,4), rng.randint(1,4), rng.randint(1,4))
+        cls.seed = 42
+
+        cls.sampler = SimulatedAnnealingSampler()
+
     def test_scenario_setup(self):
+        """Check scenario sizes on the smallest and largest test grids"""
 
-        w, h = random.randint(10,20), random.randint(10,20)
-        num_poi, num_cs, num_new_cs = (random.randint(1,4), random.randint(1,4), random.randint(1,4))
+        for w, h, num_poi, num_cs in [(10, 10, 1, 1), (20, 20, 4, 4)]:
+            with self.subTest(w=w, h=h, num_poi=num_poi, num_cs=num_cs):
 
-        G, pois, charging_stations, potential_new_cs_nodes = demo.set_up_scenario(w, h, num_poi, num_cs)
+                nodes, pois, charging_stations, potential_new_cs_nodes = _scenario(w, h, num_poi, num_cs, self.seed)
 
-        self.assertEqual(len(G.nodes()), w*h)
-        self.assertEqual(len(pois), num_poi)
-        self.assertEqual(len(charging_stations), num_cs)
-        self.assertEqual(len(potential_new_cs_nodes), len(G.nodes())-len(charging_stations))
+                self.assertEqual(len(nodes), w*h)
+                self.assertEqual(len(pois), num_poi)
+                self.assertEqual(len(charging_stations), num_cs)
+                self.assertEqual(len(potential_new_cs_nodes), len(nodes)-len(charging_stations))
 
     def test_num_new_cs(self):
         """Check that correct number of new charging locations are found in a random scenario"""
 
-        w, h = (random.randint(10,20), random.randint(10,20))
-        num_poi, num_cs, num_new_cs = (random.randint(1,4), random.randint(1,4), random.randint(1,4))
+        key = (self.w, self.h, self.num_poi, self.num_cs)
+        num_new_cs = self.num_new_cs
 
-        G, pois, charging_stations, potential_new_cs_nodes = demo.set_up_scenario(w, h, num_poi, num_cs)
+        _, _, _, potential_new_cs_nodes = _scenario(*key, self.seed)
 
-        bqm = demo.build_bqm(potential_new_cs_nodes, num_poi, pois, num_cs, charging_stations, num_new_cs)
+        bqm = _bqm(*key, num_new_cs, self.seed)
 
-        sampler = SimulatedAnnealingSampler()
-        new_charging_nodes = demo.run_bqm_and_collect_solutions(bqm, sampler, potential_new_cs_nodes, num_reads=10, seed=42)
+        sampler = self.sampler
+        new_charging_nodes = demo.run_bqm_and_collect_solutions(bqm, sampler, potential_new_cs_nodes, num_reads=5, num_sweeps=50, seed=42)
 
         self.assertEqual(num_new_cs, len(new_charging_nodes))
 
@@ -70,16 +101,15 @@ class TestDemo(unittest.TestCase):
         w, h = (15, 15)
         num_poi, num_cs, num_new_cs = (3, 0, 1)
 
-        _, pois, charging_stations, potential_new_cs_nodes = demo.set_up_scenario(w, h, num_poi, num_cs)
+        _, _, charging_stations, potential_new_cs_nodes = _scenario(w, h, num_poi, num_cs, self.seed)
 
-        pois = [(0,0),(6,14),(14,0)]
-        centroid = np.array(pois).mean(axis=0).round().tolist()
+        pois = _FIXED_POIS
+        centroid = _POI_CENTROID
 
         bqm = demo.build_bqm(potential_new_cs_nodes, num_poi, pois, num_cs, charging_stations, num_new_cs)
 
-        # random.seed(1)
-        sampler = SimulatedAnnealingSampler()
-        new_charging_nodes = demo.run_bqm_and_collect_solutions(bqm, sampler, potential_new_cs_nodes, num_reads=10, seed=42)
+        sampler = self.sampler
+        new_charging_nodes = demo.run_bqm_and_collect_solutions(bqm, sampler, potential_new_cs_nodes, num_reads=10, num_sweeps=100, seed=42)
 
         new_cs_x = new_charging_nodes[0][0]
         new_cs_y = new_charging_nodes[0][1]
@@ -93,31 +123,51 @@ class TestDemo(unittest.TestCase):
         w, h = (15, 15)
         num_poi, num_cs, num_new_cs = (0, 0, 2)
 
-        _, pois, charging_stations, potential_new_cs_nodes = demo.set_up_scenario(w, h, num_poi, num_cs)
+        _, _, _, potential_new_cs_nodes = _scenario(w, h, num_poi, num_cs, self.seed)
 
-        bqm = demo.build_bqm(potential_new_cs_nodes, num_poi, pois, num_cs, charging_stations, num_new_cs)
+        bqm = _bqm(w, h, num_poi, num_cs, num_new_cs, self.seed)
 
-        # random.seed(1)
-        sampler = SimulatedAnnealingSampler()
-        new_charging_nodes = demo.run_bqm_and_collect_solutions(bqm, sampler, potential_new_cs_nodes, num_reads=10, seed=42)
+        sampler = self.sampler
+        new_charging_nodes = demo.run_bqm_and_collect_solutions(bqm, sampler, potential_new_cs_nodes, num_reads=10, num_sweeps=100, seed=42)
 
-        new_cs_dist = math.sqrt(demo.distance(new_charging_nodes[0], new_charging_nodes[1]))
+        # Distance between the closest pair of new chargers
+        new_cs_dist = pdist(new_charging_nodes).min()
 
         self.assertGreater(new_cs_dist, 10)
 
     def test_same_bqm(self):
         """Run demo.py and demo_numpy.py with same inputs to check same BQM created."""
 
-        w, h = (random.randint(10,20), random.randint(10,20))
-        num_poi, num_cs, num_new_cs = (random.randint(1,4), random.randint(1,4), random.randint(1,4))
+        key = (self.w, self.h, self.num_poi, self.num_cs)
+        num_poi, num_cs, num_new_cs = self.num_poi, self.num_cs, self.num_new_cs
 
-        G, pois, charging_stations, potential_new_cs_nodes = demo.set_up_scenario(w, h, num_poi, num_cs)
+        _, pois, charging_stations, potential_new_cs_nodes = _scenario(*key, self.seed)
 
-        bqm = demo.build_bqm(potential_new_cs_nodes, num_poi, pois, num_cs, charging_stations, num_new_cs)
+        bqm = _bqm(*key, num_new_cs, self.seed)
         bqm_np = demo_numpy.build_bqm(potential_new_cs_nodes, num_poi, pois, num_cs, charging_stations, num_new_cs)
         bqm_np.offset += bqm.offset
 
         dimod.testing.asserts.assert_bqm_almost_equal(bqm, bqm_np)
 
+    @unittest.skipIf(demo.njit is None, "Numba is not installed.")
+    def test_numba_pairs(self):
+        """Check that the Numba pairwise kernel matches the NumPy pair biases."""
+
+        _, _, _, potential_new_cs_nodes = _scenario(self.w, self.h, self.num_poi, self.num_cs, self.seed)
+
+        cand = np.asarray(potential_new_cs_nodes)
+        gamma3, gamma4 = (1.7, 8.)
+
+        rows, cols, vals = demo._build_pairs_numba(np.ascontiguousarray(cand[:, 0]),
+                                                   np.ascontiguousarray(cand[:, 1]),
+                                                   gamma3, gamma4)
+
+        expected_rows, expected_cols = np.triu_indices(len(cand), k=1)
+        expected_vals = 2 * gamma4 - pdist(cand, 'sqeuclidean') * gamma3
+
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_array_equal(cols, expected_cols)
+        np.testing.assert_allclose(vals, expected_vals)
+
 if __name__ == '__main__':
     unittest.main()